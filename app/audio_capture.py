@@ -1,50 +1,185 @@
 # app/audio_capture.py
+import os
+import sys
+
 import pyaudio
 import queue
-import threading
+
+import numpy as np
+
+
+def tune_current_thread(realtime=False, cpu=None):
+    """
+    Best effort für den aufrufenden Thread: Echtzeit-Priorität und/oder CPU-Pinning.
+    Ohne Rechte (z.B. kein CAP_SYS_NICE) passiert einfach nichts; kein Logging,
+    da dies auch aus dem Audio-Callback aufgerufen wird.
+    """
+    if realtime:
+        try:
+            if sys.platform.startswith("linux"):
+                # pid 0 = aufrufender Thread
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(20))
+            elif sys.platform == "win32":
+                import ctypes
+                kernel32 = ctypes.windll.kernel32
+                THREAD_PRIORITY_TIME_CRITICAL = 15
+                kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_PRIORITY_TIME_CRITICAL)
+        except Exception:
+            pass
+
+    if cpu is not None:
+        try:
+            if hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(0, {cpu})
+            elif sys.platform == "win32":
+                import ctypes
+                kernel32 = ctypes.windll.kernel32
+                kernel32.SetThreadAffinityMask(kernel32.GetCurrentThread(), 1 << cpu)
+        except Exception:
+            pass
+
+
+class PcmRingBuffer:
+    """
+    Lock-freier Single-Producer/Single-Consumer Ringbuffer für int16-PCM.
+
+    Backing ist ein einmalig vorallokiertes np.int16-Array; der Producer
+    (PortAudio-Callback) kopiert per Modulo-Index hinein, der Consumer hält
+    seinen eigenen Lese-Cursor und greift mit view(start, n) zu.
+    write_pos zählt monoton alle jemals geschriebenen Samples und wird erst
+    nach dem Kopieren veröffentlicht – der Consumer sieht also nie halbe Chunks.
+    max_chunk: größter erwarteter Schreibblock; so viel kann der Producer gerade
+    über write_pos hinaus überschreiben (Sicherheitsabstand in is_intact).
+    """
+    def __init__(self, capacity, max_chunk=0):
+        self.capacity = int(capacity)
+        self.max_chunk = int(max_chunk)
+        self._buf = np.zeros(self.capacity, dtype=np.int16)
+        self.write_pos = 0
+
+    def reset(self):
+        self.write_pos = 0
+
+    def write(self, data):
+        src = np.frombuffer(data, dtype=np.int16)
+        n = src.size
+        if not n:
+            return
+        if n > self.capacity:
+            src = src[-self.capacity:]
+        if n > self.max_chunk:
+            # Vor dem Kopieren anheben, damit is_intact den größeren Abstand schon sieht
+            self.max_chunk = n
+
+        start = (self.write_pos + n - src.size) % self.capacity
+        first = min(src.size, self.capacity - start)
+        self._buf[start:start + first] = src[:first]
+        if first < src.size:
+            self._buf[:src.size - first] = src[first:]
+
+        # Erst nach dem Kopieren veröffentlichen
+        self.write_pos += n
+
+    def view(self, start, n):
+        """
+        n Samples ab der absoluten Position start.
+        Zero-Copy-View auf das Backing; nur wenn der Bereich umbricht, wird kopiert.
+        Gültig, solange is_intact(start) gilt – danach hat der Producer ihn überschrieben.
+        """
+        if n > self.capacity:
+            raise ValueError(f"view({n}) größer als Kapazität {self.capacity}")
+        i = start % self.capacity
+        if i + n <= self.capacity:
+            return self._buf[i:i + n]
+        first = self.capacity - i
+        return np.concatenate((self._buf[i:], self._buf[:n - first]))
+
+    def parts(self, start, n):
+        """Wie view(), aber ohne Kopie auch beim Umbruch: ein oder zwei Views in Reihenfolge."""
+        if n > self.capacity:
+            raise ValueError(f"parts({n}) größer als Kapazität {self.capacity}")
+        i = start % self.capacity
+        if i + n <= self.capacity:
+            return (self._buf[i:i + n],)
+        first = self.capacity - i
+        return (self._buf[i:], self._buf[:n - first])
+
+    def is_intact(self, start):
+        """
+        True, solange Daten ab start noch nicht überschrieben wurden – auch nicht von
+        einem gerade laufenden write() (der bis zu max_chunk Samples über write_pos hinaus schreibt).
+        """
+        return self.write_pos + self.max_chunk - start <= self.capacity
+
 
 class MicrophoneCapture:
     """
-    Einfacher Mikrofon-Capture mit pyaudio.
-    Schreibt PCM-Chunks in eine Queue.
+    Mikrofon-Capture mit pyaudio im Callback-Modus.
+    Der PortAudio-Callback schreibt PCM direkt in einen PcmRingBuffer
+    (falls übergeben), sonst in eine Queue.
+
+    realtime_priority / cpu: beim ersten Callback wird der Audio-Thread hochpriorisiert
+    bzw. auf diese CPU gepinnt (weniger Overruns durch Preemption).
     """
-    def __init__(self, sample_rate=16000, chunk_duration_ms=100):
+    def __init__(self, sample_rate=16000, chunk_duration_ms=100, ring=None,
+                 realtime_priority=False, cpu=None):
         self.sample_rate = sample_rate
         self.chunk_size = int(sample_rate * chunk_duration_ms / 1000)
         self.audio_queue = queue.Queue()
+        self.ring = ring
+        # Monotoner Zähler aller erfassten Samples (nur der Callback schreibt)
+        self._queued_samples = 0
+        self.realtime_priority = realtime_priority
+        self.cpu = cpu
+        self._thread_tuned = False
         self._running = False
-        self._thread = None
+        self._pa = None
+        self._stream = None
         
     def start(self):
         if self._running:
             return
         self._running = True
-        self._thread = threading.Thread(target=self._capture_loop, daemon=True)
-        self._thread.start()
-        
-    def stop(self):
-        self._running = False
-        if self._thread:
-            self._thread.join(timeout=2)
-            
-    def _capture_loop(self):
-        p = pyaudio.PyAudio()
-        stream = p.open(
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(
             format=pyaudio.paInt16,
             channels=1,
             rate=self.sample_rate,
             input=True,
-            frames_per_buffer=self.chunk_size
+            frames_per_buffer=self.chunk_size,
+            stream_callback=self._callback,
         )
+        self._stream.start_stream()
         
-        while self._running:
-            try:
-                data = stream.read(self.chunk_size, exception_on_overflow=False)
-                self.audio_queue.put(data)
-            except Exception as e:
-                print(f"Mic capture error: {e}")
-                break
-                
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
+    def stop(self):
+        self._running = False
+        try:
+            if self._stream is not None:
+                self._stream.stop_stream()
+                self._stream.close()
+        except Exception as e:
+            print(f"Mic capture error: {e}")
+        finally:
+            self._stream = None
+            if self._pa is not None:
+                self._pa.terminate()
+                self._pa = None
+            
+    @property
+    def samples_written(self):
+        """Anzahl bisher erfasster Samples; lock-frei lesbar aus anderen Threads."""
+        if self.ring is not None:
+            return self.ring.write_pos
+        return self._queued_samples
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        if not self._thread_tuned:
+            # PortAudio besitzt den Thread; erst hier sind wir darin
+            self._thread_tuned = True
+            tune_current_thread(self.realtime_priority, self.cpu)
+        if self.ring is not None:
+            self.ring.write(in_data)
+        else:
+            self.audio_queue.put(in_data)
+            self._queued_samples += frame_count
+        return (None, pyaudio.paContinue if self._running else pyaudio.paComplete)
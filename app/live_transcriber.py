@@ -1,21 +1,106 @@
 # app/live_transcriber.py
 from __future__ import annotations
 
+import bisect
+import math
+import collections
+import heapq
 import os
-import queue
-import tempfile
 import threading
 import time
-import wave
 import logging
 from logging.handlers import RotatingFileHandler
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Callable, Optional
 
 import numpy as np
 
-from app.audio_capture import MicrophoneCapture
-from app.stt_whisperx import WhisperXConfig, WhisperXTranscriber
+from app.audio_capture import MicrophoneCapture, PcmRingBuffer, tune_current_thread
+from app.stt_whisperx import WhisperXConfig, WhisperXTranscriber, pcm16_to_float32
+
+
+# ---- Numba (optional) ----
+# Fusioniert RMS/Peak in eine Schleife ohne Temporaries und gibt dabei den GIL frei.
+# Ohne numba (oder wenn kein Cache-Pfad verfügbar ist, z.B. in der EXE) greift der NumPy-Pfad.
+try:
+    from numba import njit
+
+    @njit(nogil=True, cache=True)
+    def _audio_stats_kernel(samples):
+        ssq = np.int64(0)
+        peak = np.int64(0)
+        for i in range(samples.size):
+            v = np.int64(samples[i])
+            ssq += v * v
+            a = -v if v < 0 else v
+            if a > peak:
+                peak = a
+        return ssq, peak
+except Exception:
+    _audio_stats_kernel = None
+
+
+__all__ = ["LiveTranscriber", "LiveParams"]
+
+
+# Whitespace + Satzzeichen, die für den Dedupe-Vergleich entfernt werden (ein translate-Durchlauf)
+_STRIP_TBL = str.maketrans("", "", " \t\r\n.,!?;:\"'()[]{}")
+
+
+def _norm_tokens(text: str) -> list[str]:
+    """Kleingeschriebene Wort-Tokens ohne Satzzeichen (Index passt zu text.split())."""
+    return [t.translate(_STRIP_TBL) for t in text.lower().split()]
+
+
+def _overlap_len(recent: list[str], tokens: list[str], min_overlap: int, max_overlap: int) -> int:
+    """
+    Länge des längsten Präfixes von tokens (min_overlap..max_overlap Wörter), das einem Suffix
+    von recent entspricht; 0, wenn keins passt.
+    """
+    for k in range(min(len(recent), len(tokens), max_overlap), max(1, min_overlap) - 1, -1):
+        if recent[-k:] == tokens[:k]:
+            return k
+    return 0
+
+
+def _window_first_flags(segments: list, window_starts: list[float]) -> list[tuple[dict, bool]]:
+    """
+    Segmente mit Markierung versehen, ob sie das erste Segment ihres Fensters sind.
+    window_starts: aufsteigende Fenstergrenzen (Sekunden) im transkribierten Audio.
+    """
+    flagged = []
+    current = -1
+    for seg in segments:
+        w = bisect.bisect_right(window_starts, float(seg.get("start") or 0.0)) - 1
+        flagged.append((seg, w > current))
+        current = max(current, w)
+    return flagged
+
+
+def _audio_stats(*parts: np.ndarray) -> tuple[float, int]:
+    """
+    RMS und Peak eines int16-Fensters in einem Durchlauf ohne Float-Kopie.
+    Die Quadratsumme wird direkt in int64 akkumuliert (kein Überlauf, keine Temporaries).
+    Mehrere Teile (z.B. die zwei Hälften eines umbrechenden Ringbuffer-Fensters) zählen als ein Fenster.
+    """
+    size = 0
+    ssq = 0
+    peak = 0
+    for samples in parts:
+        if not samples.size:
+            continue
+        size += samples.size
+        if _audio_stats_kernel is not None:
+            part_ssq, part_peak = _audio_stats_kernel(samples)
+            ssq += int(part_ssq)
+            peak = max(peak, int(part_peak))
+        else:
+            ssq += int(np.einsum("i,i->", samples, samples, dtype=np.int64))
+            peak = max(peak, -int(samples.min()), int(samples.max()))
+    if not size:
+        return 0.0, 0
+    return math.sqrt(ssq / size), peak
 
 
 @dataclass
@@ -27,20 +112,45 @@ class LiveParams:
 
     # Fensterung (pseudo-live)
     window_seconds: float = 5.0
+    # Stabile Baseline: 1.5 s. Experiment (docs §9): 0.5 s Stride + prompt_tail_tokens=30
     overlap_seconds: float = 1.5
     capture_chunk_ms: int = 100
 
     # Robustheit
-    queue_timeout_s: float = 0.2
+    # Worker wird per Condition sofort geweckt; der Timeout ist nur ein Sicherheitsnetz
+    queue_timeout_s: float = 1.0
     status_interval_s: float = 0.5
     max_backlog_chunks: int = 200
 
+    # Rückstau: so viele wartende Fenster werden in einem WhisperX-Aufruf gebündelt
+    max_batch_windows: int = 4
+    # Parallele WhisperX-Aufrufe auf dem gemeinsamen Modell. Das Modell hat num_workers=1 und nutzt
+    # bereits alle Kerne (cpu_threads) – CTranslate2 serialisiert gleichzeitige Aufrufe, mehr als
+    # 1 überlappt also nur Vor-/Nachbearbeitung (mit älterem initial_prompt, extra Puffer)
+    transcribe_workers: int = 1
+
+    # Scheduling: Audio-Callback hochpriorisieren, Audio-Threads optional auf eine (isolierte) CPU pinnen
+    audio_realtime_priority: bool = True
+    audio_cpu: Optional[int] = None
+
     # Graceful stop / flush
     min_flush_seconds: float = 0.6
 
     # Silence gate
     silence_rms_threshold: float = 80.0
     silence_peak_threshold: int = 900
+    # Vor-Gate im Collector: laufende Pegel je eintreffendem Chunk; stille Fenster gar nicht erst einreihen
+    collector_silence_gate: bool = True
+
+    # Left-Context: so viele zuletzt ausgegebene Wörter gehen als initial_prompt ans nächste Fenster
+    # (0 = aus, Baseline; nur zusammen mit kleinerem overlap_seconds sinnvoll)
+    prompt_tail_tokens: int = 0
+
+    # Token-Overlap-Dedupe (Experiment, docs §10): Anfang des ersten Segments eines Fensters kürzen,
+    # wenn er die letzten Wörter wiederholt. 0 = aus (Baseline: nur exakte Duplikate);
+    # 3 passt zum 0.5-s-Stride aus §9 (1-3 doppelt dekodierte Wörter)
+    dedupe_min_overlap_tokens: int = 2
+    dedupe_max_overlap_tokens: int = 0
 
     # Debug
     log_audio_level: bool = True
@@ -49,7 +159,7 @@ class LiveParams:
 class LiveTranscriber:
     """
     Kontinuierliche (pseudo-)Live-Transkription von Mikrofon-Audio.
-    WhisperX wird fensterweise auf WAV-Snapshots angewendet.
+    WhisperX wird fensterweise direkt auf float32-Snapshots angewendet (ohne WAV-Umweg).
 
     Enthält detailliertes File-Logging nach ../live_debug.log (relativ zu diesem File).
     """
@@ -75,19 +185,48 @@ class LiveTranscriber:
         self._collector_thread: Optional[threading.Thread] = None
         self._transcribe_thread: Optional[threading.Thread] = None
 
-        self._transcribe_q: "queue.Queue[bytes]" = queue.Queue(maxsize=20)
+        # SPSC-Übergabe Collector -> Worker; maxlen verwirft bei Rückstau automatisch das älteste Fenster
+        # Elemente sind (start, n)-Tickets in den Ringbuffer, keine Kopien
+        self._transcribe_dq: "collections.deque[tuple[int, int]]" = collections.deque(maxlen=20)
+        self._transcribe_cv = threading.Condition()
         self._last_status_ts = 0.0
 
         self._transcriber: Optional[WhisperXTranscriber] = None
 
-        # Ringbuffer + Lock, damit stop() sauber flushen kann
-        self._ring = bytearray()
-        self._ring_lock = threading.Lock()
-
-        # Dedupe: nur exakte Duplikate
+        # Lock-freier SPSC-Ringbuffer (int16-Arena): Capture schreibt, Collector/Worker lesen Views.
+        # Kapazität deckt den erlaubten Backlog ab (mind. 2 Fenster); ältere Fenster gelten als verworfen.
+        # Ein Chunk extra: den schreibt der Callback gerade, er zählt nicht als lesbar (is_intact).
+        p = self.params
+        window_samples = int(p.sample_rate * p.window_seconds * p.channels)
+        chunk_samples = int(p.sample_rate * p.capture_chunk_ms / 1000) * p.channels
+        self._ring = PcmRingBuffer(
+            capacity=max(window_samples * 2, p.max_backlog_chunks * chunk_samples) + chunk_samples,
+            max_chunk=chunk_samples,
+        )
+        # Lese-Cursor (absolute Sample-Position); gehört dem Collector, nach dessen Ende stop()
+        self._ring_read_pos = 0
+
+        # Wiederverwendete float32-Puffer für die WhisperX-Übergabe (einer je laufendem Job)
+        self._f32_window = window_samples
+        self._f32_free: list[np.ndarray] = []
+
+        # Parallele Jobs liefern Segmente ggf. außer der Reihe -> per Sequenznummer sortiert ausgeben
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._inflight: Optional[threading.BoundedSemaphore] = None
+        self._emit_lock = threading.Lock()
+        self._emit_heap: list[tuple[int, list]] = []
+        self._next_seq = 0
+        self._next_emit_seq = 0
+
+        # Dedupe: exakte Duplikate + Token-Überlappung mit den zuletzt ausgegebenen Wörtern
         self._last_emitted = ""
+        self._last_norm = ""
+        self._recent_tokens: "collections.deque[str]" = collections.deque(maxlen=p.dedupe_max_overlap_tokens)
+        # Originalwörter für den initial_prompt (unter _emit_lock gepflegt)
+        self._prompt_words: "collections.deque[str]" = collections.deque(maxlen=p.prompt_tail_tokens)
 
         # --- File logging ---
+        # INFO im Normalbetrieb; Pro-Fenster-/Pro-Segment-Details laufen auf DEBUG
         self._logger = logging.getLogger("continuous_v2t.live")
         self._logger.setLevel(logging.INFO)
 
@@ -109,7 +248,10 @@ class LiveTranscriber:
     # Logging helpers
     # -----------------------------
 
-    def _log_status(self, msg: str) -> None:
+    def _log_status(self, msg: str, *args) -> None:
+        # %-Formatierung erst hier, damit gedrosselte Aufrufe keinen String bauen
+        if args:
+            msg = msg % args
         try:
             self._logger.info(msg)
         except Exception:
@@ -119,16 +261,25 @@ class LiveTranscriber:
         except Exception:
             pass
 
-    def _throttled_status(self, msg: str) -> None:
+    def _throttled_status(self, msg: str, *args) -> None:
         now = time.time()
         if now - self._last_status_ts >= self.params.status_interval_s:
             self._last_status_ts = now
-            self._log_status(msg)
+            self._log_status(msg, *args)
 
     # -----------------------------
     # Public controls
     # -----------------------------
 
+    @staticmethod
+    def preload(config: WhisperXConfig) -> None:
+        """
+        Modell laden (prozessweiter Cache) und den Numba-Kernel des Silence-Gates vorkompilieren.
+        Blockiert; aus einem Hintergrund-Thread aufrufen, damit start() danach nichts mehr lädt.
+        """
+        WhisperXTranscriber(config).preload()
+        _audio_stats(np.zeros(1, dtype=np.int16))
+
     def start(self) -> None:
         if self._running:
             return
@@ -138,13 +289,21 @@ class LiveTranscriber:
         self._running = True
         self._stop_event.clear()
 
-        with self._ring_lock:
-            self._ring = bytearray()
+        self._ring.reset()
+        self._ring_read_pos = 0
+        self._recent_tokens.clear()
+        self._prompt_words.clear()
+        self._emit_heap = []
+        self._next_seq = 0
+        self._next_emit_seq = 0
 
-        # Capture starten
+        # Capture starten (schreibt direkt in den Ringbuffer)
         self._capture = MicrophoneCapture(
             sample_rate=self.params.sample_rate,
             chunk_duration_ms=self.params.capture_chunk_ms,
+            ring=self._ring,
+            realtime_priority=self.params.audio_realtime_priority,
+            cpu=self.params.audio_cpu,
         )
         self._capture.start()
 
@@ -155,7 +314,6 @@ class LiveTranscriber:
         self._transcriber = WhisperXTranscriber(
             self.cfg,
             on_status=self._on_status,
-            on_segment=self._on_segment,
         )
         
         self._log_status("Preload: lade WhisperX Modell…")
@@ -183,7 +341,7 @@ class LiveTranscriber:
         """
         Graceful stop:
         - Audioaufnahme stoppen
-        - Rest-Audio aus der Capture-Queue in den Ringbuffer ziehen
+        - Collector beenden (danach gehört der Ringbuffer-Rest stop())
         - Letzten Snapshot flushen (auch wenn kleiner als window_seconds, aber >= min_flush_seconds)
         - Worker fertig rechnen lassen
         """
@@ -203,74 +361,57 @@ class LiveTranscriber:
         except Exception as e:
             self._logger.exception("Error stopping capture: %s", e)
 
-        # 2) Restliche Audio-Queue drainen
-        drained = 0
-        if self._capture is not None:
-            try:
-                while True:
-                    data = self._capture.audio_queue.get_nowait()
-                    if not data:
-                        continue
-                    with self._ring_lock:
-                        self._ring.extend(data)
-                    drained += 1
-            except Exception:
-                pass
-
-        if drained:
-            self._log_status(f"Live: {drained} Rest-Frames aus Queue übernommen.")
-
-        # 3) Flush, wenn genug Audio vorhanden
-        sample_bytes_per_sec = p.sample_rate * p.channels * p.sampwidth_bytes
-        min_flush_bytes = int(p.min_flush_seconds * sample_bytes_per_sec)
-
-        flush_bytes: bytes = b""
-        with self._ring_lock:
-            ring_len = len(self._ring)
-            if ring_len >= min_flush_bytes:
-                flush_bytes = bytes(self._ring)
-            self._ring = bytearray()
-
-        self._logger.info("stop(): ring_len=%s, min_flush_bytes=%s, will_flush=%s",
-                          ring_len, min_flush_bytes, bool(flush_bytes))
-
-        # Flush-Silence-Gate
-        if flush_bytes:
-            samples = np.frombuffer(flush_bytes, dtype=np.int16)
-            rms = float(np.sqrt(np.mean(samples.astype(np.float32) ** 2))) if samples.size else 0.0
-            peak = int(np.max(np.abs(samples))) if samples.size else 0
+        # 2) Collector beenden; der Worker läuft weiter, bis _stop_event gesetzt ist
+        self._running = False
+        t = self._collector_thread
+        if t and t.is_alive():
+            self._logger.info("Joining collector thread...")
+            t.join(timeout=15.0)
+            self._logger.info("collector thread alive=%s", t.is_alive())
+
+        # 3) Flush, wenn genug Audio vorhanden (alles ab dem Lese-Cursor)
+        min_flush_samples = int(p.min_flush_seconds * p.sample_rate * p.channels)
+
+        write_pos = self._ring.write_pos
+        start = max(self._ring_read_pos, write_pos - self._ring.capacity)
+        ring_len = write_pos - start
+
+        # Der Rest bleibt im Ringbuffer (Capture ist gestoppt); an den Worker geht nur das Ticket
+        do_flush = ring_len >= min_flush_samples
+        self._ring_read_pos = write_pos
+
+        self._logger.info("stop(): ring_len=%s, min_flush_samples=%s, will_flush=%s",
+                          ring_len, min_flush_samples, do_flush)
+
+        # Flush-Silence-Gate direkt auf den Ringbuffer-Views (auch bei Umbruch keine Kopie)
+        if do_flush:
+            rms, peak = _audio_stats(*self._ring.parts(start, ring_len))
             flush_rms_thr = p.silence_rms_threshold * 0.8
             flush_peak_thr = int(p.silence_peak_threshold * 1.3)
 
             if (rms < flush_rms_thr) and (peak < flush_peak_thr):
-                self._log_status(f"Live: Skip flush (too silent, rms={rms:.1f}, peak={peak})")
-                flush_bytes = b""
+                self._log_status("Live: Skip flush (too silent, rms=%.1f, peak=%s)", rms, peak)
+                do_flush = False
 
-        if flush_bytes:
+        if do_flush:
             try:
-                try:
-                    self._transcribe_q.put_nowait(flush_bytes)
-                except queue.Full:
-                    try:
-                        _ = self._transcribe_q.get_nowait()
-                    except Exception:
-                        pass
-                    self._transcribe_q.put_nowait(flush_bytes)
+                self._enqueue_window(start, ring_len)
                 self._log_status("Live: letzten Buffer flush zur Transkription übergeben.")
             except Exception as e:
                 self._logger.exception("Error queueing flush chunk: %s", e)
         else:
             self._log_status("Live: nichts zu flushen (zu wenig Audio oder zu leise).")
 
-        # 4) Stop-Signal setzen und Threads auslaufen lassen
-        self._running = False
+        # 4) Stop-Signal setzen und Worker auslaufen lassen
         self._stop_event.set()
+        with self._transcribe_cv:
+            self._transcribe_cv.notify_all()
 
-        for tname, t in (("collector", self._collector_thread), ("transcribe", self._transcribe_thread)):
-            if t and t.is_alive():
-                self._logger.info("Joining %s thread...", tname)
-                t.join(timeout=15.0)
-                self._logger.info("%s thread alive=%s", tname, t.is_alive())
+        t = self._transcribe_thread
+        if t and t.is_alive():
+            self._logger.info("Joining transcribe thread...")
+            t.join(timeout=15.0)
+            self._logger.info("transcribe thread alive=%s", t.is_alive())
 
         self._log_status("Live-Transkription gestoppt.")
 
@@ -281,25 +422,47 @@ class LiveTranscriber:
     def _on_status(self, msg: str) -> None:
         # WhisperX meldet relativ viel; wir loggen es in Datei (nicht in UI flooden)
         try:
-            self._logger.info("WhisperX: %s", msg)
+            self._logger.debug("WhisperX: %s", msg)
         except Exception:
             pass
 
-    def _on_segment(self, seg: dict) -> None:
+    def _on_segment(self, seg: dict, window_first: bool = False) -> None:
         text = (seg.get("text") or "").strip()
         if not text:
             return
 
-        # Minimal-Dedupe: exakte Duplikate
-        norm = text.lower().strip(" \t\r\n.,!?;:\"'()[]{}")
-        last = self._last_emitted.lower().strip(" \t\r\n.,!?;:\"'()[]{}")
+        p = self.params
 
-        if norm == last:
-            self._logger.info("Segment deduped (normalized): %s", text)
+        # Minimal-Dedupe: exakte Duplikate (normalisierte Form des letzten Segments ist gecacht)
+        norm = text.lower().translate(_STRIP_TBL)
+
+        if norm == self._last_norm:
+            self._logger.debug("Segment deduped (normalized): %s", text)
             return
 
+        # Overlap-Dedupe: nur das erste Segment eines Fensters kann Audio aus dem Overlap wiederholen;
+        # dessen Anfang abschneiden, wenn er die letzten ausgegebenen Wörter wiederholt
+        words = text.split()
+        tokens = _norm_tokens(text)
+        k = 0
+        if window_first:
+            k = _overlap_len(list(self._recent_tokens), tokens,
+                             p.dedupe_min_overlap_tokens, p.dedupe_max_overlap_tokens)
+
+        if k >= len(tokens):
+            self._logger.debug("Segment deduped (overlap): %s", text)
+            return
+        if k:
+            self._logger.debug("Segment overlap trimmed (%s tokens): %s", k, text)
+            text = " ".join(words[k:])
+            tokens = tokens[k:]
+            norm = "".join(tokens)
+
+        self._recent_tokens.extend(tokens)
+        self._prompt_words.extend(text.split())
         self._last_emitted = text
-        self._logger.info("Segment emit: %s", text)
+        self._last_norm = norm
+        self._logger.debug("Segment emit: %s", text)
 
         try:
             self.on_text(text)
@@ -310,81 +473,95 @@ class LiveTranscriber:
     # Intern: Collector
     # -----------------------------
 
+    def _enqueue_window(self, start: int, n: int) -> None:
+        dq = self._transcribe_dq
+        if len(dq) == dq.maxlen:
+            self._logger.warning("Transcribe queue full (%s). Dropping oldest snapshot.", dq.maxlen)
+        with self._transcribe_cv:
+            dq.append((start, n))
+            self._transcribe_cv.notify()
+
     def _collector_loop(self) -> None:
         assert self._capture is not None
 
         p = self.params
-        window_bytes = int(p.sample_rate * p.window_seconds * p.sampwidth_bytes * p.channels)
-        overlap_bytes = int(p.sample_rate * p.overlap_seconds * p.sampwidth_bytes * p.channels)
+        capture = self._capture
+        tune_current_thread(cpu=p.audio_cpu)
+        window_samples = int(p.sample_rate * p.window_seconds * p.channels)
+        overlap_samples = int(p.sample_rate * p.overlap_seconds * p.channels)
+        hop_samples = max(1, window_samples - overlap_samples)
+        # Backlog-Grenze (nie größer als der lesbare Teil des Ringbuffers, sonst wären die Daten schon überschrieben)
+        readable = self._ring.capacity - self._ring.max_chunk
+        max_backlog_samples = min(p.max_backlog_chunks * capture.chunk_size * p.channels, readable)
+        keep_backlog_samples = max(window_samples, max_backlog_samples // 2)
+        poll_s = p.capture_chunk_ms / 1000.0 / 2
 
-        bytes_in = 0
-        chunks_in = 0
         last_stat = time.time()
+        last_stat_pos = capture.samples_written
 
-        self._logger.info("Collector started (window_bytes=%s, overlap_bytes=%s)", window_bytes, overlap_bytes)
+        # Laufende Pegel: (end_pos, rms, peak) je neu eingetroffenem Abschnitt, nur solange im Fenster.
+        # Ab dem Lese-Cursor, nicht ab dem aktuellen write_pos: die Aufnahme läuft schon seit start()
+        # (Preload), und jedes Sample eines Fensters muss von einem Abschnitt abgedeckt sein
+        level_spans: "collections.deque[tuple[int, float, int]]" = collections.deque()
+        level_pos = max(self._ring_read_pos, last_stat_pos - readable)
+
+        self._logger.info("Collector started (window_samples=%s, overlap_samples=%s)",
+                          window_samples, overlap_samples)
 
         while self._running and not self._stop_event.is_set():
             try:
-                # Backlog-Schutz
-                qsize = self._capture.audio_queue.qsize()
-                if qsize > p.max_backlog_chunks:
-                    drop = qsize - (p.max_backlog_chunks // 2)
-                    for _ in range(drop):
-                        try:
-                            self._capture.audio_queue.get_nowait()
-                        except Exception:
-                            break
-                    self._log_status(f"Warnung: Audio-Backlog ({qsize}) reduziert (drop={drop}).")
-
-                data = self._capture.audio_queue.get(timeout=p.queue_timeout_s)
-                if not data:
-                    continue
-
-                with self._ring_lock:
-                    self._ring.extend(data)
-                    ring_len = len(self._ring)
-
-                bytes_in += len(data)
-                chunks_in += 1
+                # Lock-freier Zähler des Producers statt qsize() auf einer Queue
+                write_pos = capture.samples_written
+                read_pos = self._ring_read_pos
+
+                # Backlog-Schutz: Lese-Cursor vorziehen (älteste Samples verwerfen)
+                backlog = write_pos - read_pos
+                if backlog > max_backlog_samples:
+                    read_pos = write_pos - keep_backlog_samples
+                    self._ring_read_pos = read_pos
+                    self._log_status("Warnung: Audio-Backlog (%s Samples) reduziert (drop=%s).",
+                                     backlog, backlog - keep_backlog_samples)
+
+                if p.collector_silence_gate and write_pos > level_pos:
+                    start = max(level_pos, write_pos - readable)
+                    rms, peak = _audio_stats(*self._ring.parts(start, write_pos - start))
+                    level_spans.append((write_pos, rms, peak))
+                    level_pos = write_pos
 
                 now = time.time()
                 if now - last_stat >= p.status_interval_s:
-                    self._throttled_status(
-                        f"Collector: buffer={ring_len} bytes, in={bytes_in} B/s, chunks/s≈{chunks_in}, qsize={qsize}"
-                    )
-                    bytes_in = 0
-                    chunks_in = 0
+                    self._throttled_status("Collector: buffer=%s samples, in=%d samples/s",
+                                           write_pos - read_pos, (write_pos - last_stat_pos) / (now - last_stat))
                     last_stat = now
+                    last_stat_pos = write_pos
 
-                if ring_len >= window_bytes:
-                    with self._ring_lock:
-                        snapshot = bytes(self._ring[-window_bytes:])
+                if write_pos - read_pos < window_samples:
+                    self._stop_event.wait(poll_s)
+                    continue
 
-                        # Overlap behalten
-                        if overlap_bytes > 0:
-                            self._ring = bytearray(self._ring[-overlap_bytes:])
-                        else:
-                            self._ring = bytearray()
+                # Overlap behalten: Cursor nur um (window - overlap) weiterschieben
+                self._ring_read_pos = read_pos + hop_samples
+
+                if p.collector_silence_gate:
+                    while level_spans and level_spans[0][0] <= read_pos:
+                        level_spans.popleft()
+                    # Konservativ: lautester Abschnitt zählt. Liegt selbst der unter beiden Schwellen,
+                    # verwirft auch das Worker-Gate das Fenster sicher (mean <= max).
+                    if level_spans:
+                        max_rms = max(span[1] for span in level_spans)
+                        max_peak = max(span[2] for span in level_spans)
+                        if max_rms < p.silence_rms_threshold and max_peak < p.silence_peak_threshold:
+                            self._logger.debug("Collector: SKIP (too silent) max_rms=%.1f max_peak=%s",
+                                               max_rms, max_peak)
+                            continue
+
+                # Nur ein Ticket weitergeben; die Daten bleiben im Ringbuffer
+                self._enqueue_window(read_pos, window_samples)
+
+                if self._logger.isEnabledFor(logging.DEBUG):
+                    self._logger.debug("Collector queued snapshot (samples=%s). transcribe_q=%s",
+                                       window_samples, len(self._transcribe_dq))
 
-                    try:
-                        self._transcribe_q.put_nowait(snapshot)
-                        self._logger.info("Collector queued snapshot (bytes=%s). transcribe_q=%s",
-                                          len(snapshot), self._transcribe_q.qsize())
-                    except queue.Full:
-                        # Drop oldest and retry
-                        try:
-                            _ = self._transcribe_q.get_nowait()
-                        except Exception:
-                            pass
-                        try:
-                            self._transcribe_q.put_nowait(snapshot)
-                            self._logger.info("Collector queued snapshot after drop (bytes=%s). transcribe_q=%s",
-                                              len(snapshot), self._transcribe_q.qsize())
-                        except Exception:
-                            self._logger.warning("Collector could not queue snapshot (queue full). Dropping snapshot.")
-
-            except queue.Empty:
-                continue
             except Exception as e:
                 self._logger.exception("Collector error: %s", e)
                 if self._running:
@@ -397,81 +574,187 @@ class LiveTranscriber:
     # Intern: Transcription worker
     # -----------------------------
 
-    def _transcribe_loop(self) -> None:
-        p = self.params
+    def _acquire_float32(self, n: int) -> np.ndarray:
+        """Wiederverwendeten float32-Puffer mit mind. n Samples holen (zurückgeben mit _release_float32)."""
+        try:
+            buf = self._f32_free.pop()
+        except IndexError:
+            buf = np.empty(max(n, self._f32_window), dtype=np.float32)
+        if buf.size < n:
+            # Flush/Batch darf größer als ein Fenster sein; der größere Puffer wird danach weiterverwendet
+            buf = np.empty(n, dtype=np.float32)
+        return buf
+
+    def _to_float32(self, *parts: np.ndarray) -> np.ndarray:
+        """int16-Teile -> ein float32-Array in [-1, 1], fusionierter Durchlauf in einen wiederverwendeten Puffer."""
+        n = sum(part.size for part in parts)
+        out = self._acquire_float32(n)[:n]
+        pos = 0
+        for part in parts:
+            pcm16_to_float32(part, out[pos:pos + part.size])
+            pos += part.size
+        return out
+
+    def _release_float32(self, audio: np.ndarray) -> None:
+        self._f32_free.append(audio if audio.base is None else audio.base)
+
+    def _prompt_tail(self) -> Optional[str]:
+        """Letzte ausgegebene Wörter als Left-Context-Prompt."""
+        with self._emit_lock:
+            words = list(self._prompt_words)
+        return " ".join(words) if words else None
+
+    def _run_one(self, seq: int, windows: list[tuple[int, int]], prompt: Optional[str]) -> None:
+        """Pool-Job: ein Fenster (oder ein Batch) transkribieren, Segmente geordnet ausgeben."""
         assert self._transcriber is not None
+        ring = self._ring
+        segments: list = []
+        try:
+            if len(windows) == 1:
+                start, n = windows[0]
+                audio = self._to_float32(*ring.parts(start, n))
+                try:
+                    # Nach der Konvertierung prüfen, ob der Producer das Fenster inzwischen überschrieben hat
+                    if ring.is_intact(start):
+                        result = self._transcriber.transcribe_array(audio, initial_prompt=prompt)
+                        segments = _window_first_flags(result.get("segments", []) or [], [float("-inf")])
+                        self._logger.debug("Worker: transcribe_array finished (seq=%s)", seq)
+                    else:
+                        self._logger.warning("Worker: window overwritten before transcription (seq=%s)", seq)
+                finally:
+                    self._release_float32(audio)
+            else:
+                tx = self._transcriber
+                kept = [(start, n) for start, n in windows if ring.is_intact(start)]
+                sizes = [n for _, n in kept]
+                intact = 0
+                if kept:
+                    # int16-Views werden beim Zusammensetzen direkt in den Puffer konvertiert
+                    buf = self._acquire_float32(tx.batch_length(sizes))
+                    try:
+                        audio = tx.pack_batch([ring.view(start, n) for start, n in kept], out=buf)
+                        # Nach der Konvertierung prüfen, ob der Producer Fenster inzwischen überschrieben hat;
+                        # solche Fenster werden im Batch stummgeschaltet (Layout/Fenstergrenzen bleiben gleich)
+                        for (start, n), off in zip(kept, tx.batch_offsets(sizes)):
+                            if ring.is_intact(start):
+                                intact += 1
+                            else:
+                                audio[off:off + n] = 0.0
+                                self._logger.warning("Worker: window overwritten during conversion (seq=%s, start=%s)",
+                                                     seq, start)
+                        if intact:
+                            result = tx.transcribe_packed(audio, len(kept), initial_prompt=prompt)
+                            segments = _window_first_flags(result.get("segments", []) or [],
+                                                           self._batch_window_starts(sizes))
+                    finally:
+                        self._release_float32(buf)
+                self._logger.debug("Worker: transcribe_packed finished (seq=%s, windows=%s/%s)",
+                                  seq, intact, len(windows))
+        except Exception as e:
+            self._logger.exception("Worker: transcribe error: %s", e)
+            self._log_status("Live: Transkriptionsfehler: %s", e)
+        finally:
+            self._emit_in_order(seq, segments)
+            if self._inflight is not None:
+                self._inflight.release()
+
+    def _batch_window_starts(self, sizes: list[int]) -> list[float]:
+        """Fenstergrenzen (Sekunden) im von pack_batch gebündelten Audio; Grenze = Mitte der Lücke."""
+        sr = self.params.sample_rate * self.params.channels
+        half_gap = self._transcriber.batch_length([0, 0]) / 2
+        offsets = self._transcriber.batch_offsets(sizes)
+        return [float("-inf")] + [(off - half_gap) / sr for off in offsets[1:]]
+
+    def _emit_in_order(self, seq: int, segments: list) -> None:
+        """segments: (seg, window_first)-Paare aus _run_one."""
+        with self._emit_lock:
+            heapq.heappush(self._emit_heap, (seq, segments))
+            while self._emit_heap and self._emit_heap[0][0] == self._next_emit_seq:
+                _, segs = heapq.heappop(self._emit_heap)
+                for seg, window_first in segs:
+                    self._on_segment(seg, window_first)
+                self._next_emit_seq += 1
+
+    def _passes_gate(self, start: int, n: int) -> bool:
+        """Start-Gate + Silence-Gate für ein Fenster im Ringbuffer (inkl. Logging)."""
+        p = self.params
+        nbytes = n * p.sampwidth_bytes
 
-        self._logger.info("Transcribe worker started (silence_rms_threshold=%s)", p.silence_rms_threshold)
-
-        # Beim Stop noch ausstehende Queue-Elemente abarbeiten.
-        while (not self._stop_event.is_set()) or (not self._transcribe_q.empty()):
-            try:
-                pcm_bytes = self._transcribe_q.get(timeout=0.2)
-            except queue.Empty:
-                continue
-
-            if not pcm_bytes:
-                continue
+        # --- Silence-Gate / Audio-Level (immer berechnen) ---
+        rms, peak = _audio_stats(*self._ring.parts(start, n))
 
-            # --- Silence-Gate / Audio-Level (immer berechnen) ---
-            samples = np.frombuffer(pcm_bytes, dtype=np.int16)
-            if samples.size:
-                peak = int(np.max(np.abs(samples)))
-                rms = float(np.sqrt(np.mean(samples.astype(np.float32) ** 2)))
-            else:
-                peak = 0
-                rms = 0.0
-                
         # --- Start-Gate: erst nach klarer Sprache emitten ---
-            if not self._started_emitting:
-                if peak < 1500 and rms < 120:
-                    self._logger.info(
-                        "Worker: START-GATE skip rms=%.1f peak=%s", rms, peak
-                    )
-                    continue
-            self._started_emitting = True
+        if not self._started_emitting:
+            if peak < 1500 and rms < 120:
+                self._logger.debug(
+                    "Worker: START-GATE skip rms=%.1f peak=%s", rms, peak
+                )
+                return False
+        self._started_emitting = True
         # --- Ende Start-Gate ---
 
-            if p.log_audio_level:
-                self._throttled_status(f"Worker: audio peak={peak}, rms={rms:.1f}, bytes={len(pcm_bytes)}")
+        if p.log_audio_level:
+            self._throttled_status("Worker: audio peak=%s, rms=%.1f, bytes=%s", peak, rms, nbytes)
 
-            if samples.size and (rms < p.silence_rms_threshold) and (peak < p.silence_peak_threshold):
-                self._logger.info(
-                    "Worker: SKIP (too silent) rms=%.1f peak=%s bytes=%s", rms, peak, len(pcm_bytes)
-                )
-                continue
+        if n and (rms < p.silence_rms_threshold) and (peak < p.silence_peak_threshold):
+            self._logger.debug(
+                "Worker: SKIP (too silent) rms=%.1f peak=%s bytes=%s", rms, peak, nbytes
+            )
+            return False
 
-            # --- Ende Silence-Gate ---
+        # --- Ende Silence-Gate ---
 
-            self._log_status(f"Worker: transcribe chunk bytes={len(pcm_bytes)} peak={peak} rms={rms:.1f}")
+        self._log_status("Worker: transcribe chunk bytes=%s peak=%s rms=%.1f", nbytes, peak, rms)
+        return True
 
-            tmp_path = None
-            try:
-                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                    tmp_path = tmp.name
+    def _transcribe_loop(self) -> None:
+        p = self.params
+        assert self._transcriber is not None
 
-                with wave.open(tmp_path, "wb") as wf:
-                    wf.setnchannels(p.channels)
-                    wf.setsampwidth(p.sampwidth_bytes)
-                    wf.setframerate(p.sample_rate)
-                    wf.writeframes(pcm_bytes)
+        workers = max(1, p.transcribe_workers)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="whisperx")
+        self._inflight = threading.BoundedSemaphore(workers)
 
-                self._logger.info("Worker: wrote wav %s (bytes=%s)", tmp_path, len(pcm_bytes))
+        self._logger.info("Transcribe worker started (silence_rms_threshold=%s, max_batch_windows=%s, workers=%s)",
+                          p.silence_rms_threshold, p.max_batch_windows, workers)
 
-                # transcribe_file triggert on_segment callbacks
-                _ = self._transcriber.transcribe_file(tmp_path)
+        # Beim Stop noch ausstehende Queue-Elemente abarbeiten.
+        dq = self._transcribe_dq
+        while (not self._stop_event.is_set()) or dq:
+            if not dq:
+                with self._transcribe_cv:
+                    while not dq and not self._stop_event.is_set():
+                        self._transcribe_cv.wait(timeout=p.queue_timeout_s)
+                continue
 
-                self._logger.info("Worker: transcribe_file finished")
+            # Erst auf einen freien Job-Slot warten; in der Zeit stauen sich ggf. weitere Fenster,
+            # die dann gemeinsam als Batch transkribiert werden
+            self._inflight.acquire()
+            batch: list[tuple[int, int]] = []
+            while dq and len(batch) < p.max_batch_windows:
+                batch.append(dq.popleft())
+
+            ring = self._ring
+            windows = []
+            for start, n in batch:
+                if not n:
+                    continue
+                if not ring.is_intact(start):
+                    # Ringbuffer (Kapazität < Queue-Tiefe) hat das Fenster schon überschrieben
+                    self._logger.warning("Worker: window overwritten in ring before processing "
+                                         "(start=%s, lag=%s samples). Dropping snapshot.",
+                                         start, ring.write_pos - start)
+                    continue
+                if self._passes_gate(start, n):
+                    windows.append((start, n))
+            if not windows:
+                self._inflight.release()
+                continue
 
-            except Exception as e:
-                self._logger.exception("Worker: transcribe error: %s", e)
-                self._log_status(f"Live: Transkriptionsfehler: {e}")
-            finally:
-                if tmp_path and os.path.exists(tmp_path):
-                    try:
-                        os.unlink(tmp_path)
-                        self._logger.info("Worker: deleted tmp wav %s", tmp_path)
-                    except Exception:
-                        pass
+            seq = self._next_seq
+            self._next_seq += 1
+            self._pool.submit(self._run_one, seq, windows, self._prompt_tail())
 
+        # Laufende Jobs fertig rechnen lassen
+        self._pool.shutdown(wait=True)
         self._logger.info("Transcribe worker exited")
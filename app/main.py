@@ -3,8 +3,12 @@
 
 import sys
 import os
+import gzip
+import shutil
 import threading
-from datetime import datetime
+import time
+from collections import deque
+from datetime import datetime, timedelta
 
 # ---------------- Feature Flags ----------------
 # Schalte hier Funktionen/Buttons ein oder aus, ohne Code zu löschen.
@@ -96,7 +100,7 @@ sys.stdout = StreamToLogger(stdout_logger, logging.INFO)
 sys.stderr = StreamToLogger(stderr_logger, logging.WARNING)
 
 
-from PySide6.QtCore import Qt, QObject, Signal, Slot, QTimer, QMetaObject
+from PySide6.QtCore import Qt, QObject, QThread, Signal, Slot, QTimer, QMetaObject
 from PySide6.QtGui import QAction
 from PySide6.QtWidgets import (
     QApplication,
@@ -114,7 +118,32 @@ from PySide6.QtWidgets import (
     QFileDialog,
 )
 
-from app.stt_whisperx import WhisperXConfig, WhisperXTranscriber
+from app.stt_whisperx import AUDIO_EXTS, WhisperXConfig, WhisperXTranscriber
+
+# Dateiendungen für den Öffnen-Dialog = die Loader-Tabelle der Transkription (eine Quelle)
+_AUDIO_EXTS = AUDIO_EXTS
+_AUDIO_FILTER = "Audio (" + " ".join(f"*{e}" for e in _AUDIO_EXTS) + ");;All files (*.*)"
+
+
+def _default_whisper_config() -> WhisperXConfig:
+    """Modell-Konfiguration für Datei, Live (nur vad_options abweichend) und den Preload beim Start."""
+    return WhisperXConfig(
+        model_size="medium",
+        language="de",
+        device="cpu",
+        compute_type="int8",
+        batch_size=4,
+    )
+
+
+# Obergrenzen für lange Sitzungen: Widget-Blöcke und Zeilen im Speicher; ältere Zeilen
+# wandern in eine Overflow-Datei neben app.log und werden beim Export wieder vorangestellt
+TRANSCRIPT_MAX_BLOCKS = 5000
+TRANSCRIPT_MAX_LINES = 50000
+OVERFLOW_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+_EXPORT_FILTER_GZ = "Text, gzip-komprimiert (*.txt.gz)"
+_EXPORT_FILTER = f"Text (*.txt);;{_EXPORT_FILTER_GZ};;All files (*.*)"
 
 
 class TranscriptBus(QObject):
@@ -122,12 +151,62 @@ class TranscriptBus(QObject):
     Thread-safe Bridge: background workers -> GUI.
     """
     new_text = Signal(str)
+    segments_batch = Signal(object)  # Datei-Segmente pro Block: (starts, ends, texts)
     status = Signal(str)
     call_started = Signal(str)
     call_ended = Signal(str)
 
 
+# So lange wartet closeEvent auf den Datei-Worker; der Abbruch greift nach dem aktuellen Segment
+WORKER_STOP_TIMEOUT_MS = 3000
+
+
+class TranscriptionWorker(QObject):
+    """
+    Datei-Transkription auf einem dauerhaften QThread: Jobs kommen per job-Signal
+    (queued, einer nach dem anderen), Ergebnisse gehen über den Bus an die GUI.
+    """
+    job = Signal(str)
+    done = Signal(str)
+    failed = Signal(str)
+
+    def __init__(self, bus: TranscriptBus):
+        super().__init__()
+        self.bus = bus
+        self._tx = WhisperXTranscriber(
+            _default_whisper_config(),
+            on_status=self.bus.status.emit,
+            on_segments=self._on_segments,
+        )
+        self.job.connect(self._run)
+
+    def cancel(self) -> None:
+        # Thread-sicher (Event); wirkt nach dem aktuellen Segment der laufenden Datei
+        self._tx.cancel()
+
+    def _on_segments(self, starts, ends, texts: list[str]) -> None:
+        # Ein Signal pro Block statt pro Segment
+        self.bus.segments_batch.emit((starts, ends, texts))
+
+    @Slot(str)
+    def _run(self, path: str) -> None:
+        try:
+            self._tx.transcribe_file(path)
+            if self._tx.cancelled:
+                return
+
+            self.bus.call_ended.emit(f"Datei: {path}")
+            self.bus.status.emit("WhisperX: fertig.")
+            self.done.emit(path)
+        except Exception as e:
+            self.bus.status.emit(f"WhisperX Fehler: {e!r}")
+            self.failed.emit(repr(e))
+
+
 class MainWindow(QMainWindow):
+    # Hintergrund-Preload fertig: "" bei Erfolg, sonst Fehlermeldung
+    preload_finished = Signal(str)
+
     def __init__(self, bus: TranscriptBus):
         super().__init__()
         self.bus = bus
@@ -136,15 +215,39 @@ class MainWindow(QMainWindow):
         self.resize(1100, 650)
 
         self._current_call_label = "Kein aktiver Call"
-        self._transcript_lines: list[str] = []
-        self._last_error: str = ""
+        self._transcript_lines: deque[str] = deque(maxlen=TRANSCRIPT_MAX_LINES)
+        self._overflow_path: str = ""
+        self._overflow_file = None
+
+        # Neue Zeilen sammeln und gebündelt ins Widget schreiben (ein Layout-Durchlauf pro Flush)
+        self._pending_lines: list[str] = []
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setInterval(50)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.timeout.connect(self._flush_pending)
+
+        self._demo_active = False
+
+        # Zeitstempel für Transkriptzeilen: formatierter String + Sekunde, für die er gilt
+        self._ts_cache: tuple[str, int] = ("", -1)
 
         # Optional: LiveTranscriber holder
         self._live_transcriber = None
 
+        # Datei-Transkription: ein Worker auf einem dauerhaften QThread statt Thread pro Datei
+        self._worker_thread = None
+        self._worker = None
+        self._file_busy = False
+        if ENABLE_FILE_TRANSCRIBE:
+            self._worker_thread = QThread(self)
+            self._worker = TranscriptionWorker(self.bus)
+            self._worker.moveToThread(self._worker_thread)
+            self._worker_thread.start()
+
         self._build_ui()
         self._connect_signals()
         self._set_ready_state()
+        self._start_preload()
 
     # ---------------- UI ----------------
 
@@ -214,6 +317,7 @@ class MainWindow(QMainWindow):
 
         self.transcript_edit = QPlainTextEdit()
         self.transcript_edit.setReadOnly(True)
+        self.transcript_edit.setMaximumBlockCount(TRANSCRIPT_MAX_BLOCKS)
 
         placeholder_lines = ["Hier erscheint die Transkription."]
         if ENABLE_DEMO:
@@ -266,32 +370,113 @@ class MainWindow(QMainWindow):
 
         # Bus signals (from workers)
         self.bus.new_text.connect(self._on_new_text)
+        self.bus.segments_batch.connect(self._on_segments_batch)
         self.bus.status.connect(self._on_status)
         self.bus.call_started.connect(self._on_call_started)
         self.bus.call_ended.connect(self._on_call_ended)
 
+        self.preload_finished.connect(self._on_preload_finished)
+
+        # Worker (QThread) -> GUI, Marshalling über die Signal-Verbindung
+        if self._worker is not None:
+            self._worker.done.connect(self._on_transcription_done)
+            self._worker.failed.connect(self._on_transcription_failed)
+
     # ---------------- State helpers ----------------
 
     def _set_ready_state(self) -> None:
         self._on_status("Bereit.")
         self._update_transcript_header()
 
+    def _start_preload(self) -> None:
+        """Modell im Hintergrund laden (prozessweiter Cache); Transkriptions-Buttons erst danach."""
+        for btn in (self.btn_transcribe_file, self.btn_live_transcribe):
+            if btn is not None:
+                btn.setEnabled(False)
+        self._on_status("Lade Modelle im Hintergrund …")
+
+        def preload():
+            try:
+                if ENABLE_LIVE_TRANSCRIBE:
+                    # Live-Pfad: zusätzlich den Silence-Gate-Kernel kompilieren (nicht erst in start())
+                    from app.live_transcriber import LiveTranscriber
+
+                    LiveTranscriber.preload(_default_whisper_config())
+                else:
+                    WhisperXTranscriber(_default_whisper_config()).preload()
+                self.preload_finished.emit("")
+            except Exception as e:
+                self.preload_finished.emit(repr(e))
+
+        threading.Thread(target=preload, daemon=True).start()
+
+    @Slot(str)
+    def _on_preload_finished(self, error: str) -> None:
+        # Auch bei Fehler freigeben: dann wird beim ersten Klick regulär (mit Fehlermeldung) geladen
+        if self.btn_transcribe_file is not None and not self._file_busy:
+            self.btn_transcribe_file.setEnabled(True)
+        if self.btn_live_transcribe is not None:
+            self.btn_live_transcribe.setEnabled(True)
+        if error:
+            logging.getLogger(__name__).warning("Modell-Preload fehlgeschlagen: %s", error)
+            self._on_status(f"Modell-Preload fehlgeschlagen: {error}")
+        else:
+            self._on_status("Bereit.")
+
     def _update_transcript_header(self) -> None:
         self.lbl_transcript.setText(f"Transkript – {self._current_call_label}")
 
     def _append_transcript(self, line: str) -> None:
+        if len(self._transcript_lines) == TRANSCRIPT_MAX_LINES:
+            # Älteste Zeile fällt gleich aus der deque -> vorher auf Platte sichern
+            self._spill_line(self._transcript_lines[0])
         self._transcript_lines.append(line)
-        self.transcript_edit.appendPlainText(line)
+        self._pending_lines.append(line)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _spill_line(self, line: str) -> None:
+        if self._overflow_file is None:
+            name = f"transcript_overflow_{datetime.now().strftime('%Y%m%d')}.txt"
+            self._overflow_path = os.path.join(OVERFLOW_DIR, name)
+            self._overflow_file = open(self._overflow_path, "w", encoding="utf-8")
+        self._overflow_file.write(line + "\n")
+
+    def _close_overflow(self, remove: bool = False) -> None:
+        if self._overflow_file is not None:
+            self._overflow_file.close()
+            self._overflow_file = None
+            if remove:
+                try:
+                    os.remove(self._overflow_path)
+                except OSError:
+                    pass
+            self._overflow_path = ""
+
+    def _flush_pending(self) -> None:
+        if self._pending_lines:
+            self.transcript_edit.appendPlainText("\n".join(self._pending_lines))
+            self._pending_lines.clear()
+
+    def _hhmmss(self) -> str:
+        # Innerhalb derselben Sekunde nicht neu formatieren (Segmente kommen oft in Schüben)
+        sec = int(time.time())
+        if sec != self._ts_cache[1]:
+            self._ts_cache = (time.strftime("%H:%M:%S", time.localtime(sec)), sec)
+        return self._ts_cache[0]
 
     # ---------------- Slots (Bus) ----------------
 
     @Slot(str)
     def _on_new_text(self, text: str) -> None:
-        if "s–" in text[:20]:
-            self._append_transcript(text)
-        else:
-            ts = datetime.now().strftime("%H:%M:%S")
-            self._append_transcript(f"[{ts}] {text}")
+        self._append_transcript(f"[{self._hhmmss()}] {text}")
+
+    @Slot(object)
+    def _on_segments_batch(self, batch) -> None:
+        starts, ends, texts = batch
+        for start, end, text in zip(starts.tolist(), ends.tolist(), texts):
+            if text:
+                self._append_transcript(f"{start:7.2f}s–{end:7.2f}s: {text}")
 
     @Slot(str)
     def _on_status(self, text: str) -> None:
@@ -335,29 +520,30 @@ class MainWindow(QMainWindow):
             "Vielen Dank, das hilft mir sehr weiter.",
             "Dann wünsche ich Ihnen noch einen schönen Tag.",
         ]
-        self._demo_idx = 0
-
-        self._demo_timer = QTimer(self)
-        self._demo_timer.timeout.connect(self._emit_demo_line)
-        self._demo_timer.start(900)
+        # Ganzes Demo-Transkript einmal vorformatieren (Zeitstempel im 900-ms-Raster wie live)
+        t0 = datetime.now()
+        self._demo_batch = [
+            f"[{(t0 + timedelta(milliseconds=900 * i)).strftime('%H:%M:%S')}] "
+            f"{self._demo_lines[i % len(self._demo_lines)]}"
+            for i in range(12)
+        ]
+        self._demo_active = True
+        QTimer.singleShot(0, self._emit_demo_batch)
 
         self.bus.status.emit("Demo läuft.")
 
-    def _emit_demo_line(self) -> None:
-        if self._demo_idx >= 12:
-            self._stop_demo()
+    def _emit_demo_batch(self) -> None:
+        if not self._demo_active:
             return
-
-        line = self._demo_lines[self._demo_idx % len(self._demo_lines)]
-        self.bus.new_text.emit(line)
-        self._demo_idx += 1
+        for line in self._demo_batch:
+            self._append_transcript(line)
+        self._stop_demo()
 
     def _stop_demo(self) -> None:
-        if not ENABLE_DEMO:
+        if not ENABLE_DEMO or not self._demo_active:
             return
 
-        if hasattr(self, "_demo_timer") and self._demo_timer.isActive():
-            self._demo_timer.stop()
+        self._demo_active = False
 
         if self.btn_start_demo is not None:
             self.btn_start_demo.setEnabled(True)
@@ -379,7 +565,7 @@ class MainWindow(QMainWindow):
             self,
             "Audio auswählen",
             "",
-            "Audio (*.wav *.mp3 *.m4a *.flac *.ogg *.aac);;All files (*.*)",
+            _AUDIO_FILTER,
         )
         if not path:
             return
@@ -388,77 +574,51 @@ class MainWindow(QMainWindow):
 
     def _transcribe_audio_file_direct(self, path: str) -> None:
         """Direkt-Start ohne FileDialog (für CLI/Tests)"""
-        if not path or not os.path.exists(path):
+        if self._worker is None:
+            self.bus.status.emit("Datei-Transkription ist deaktiviert.")
+            return
+
+        try:
+            os.stat(path)
+        except (OSError, ValueError):
             self.bus.status.emit(f"Datei nicht gefunden: {path}")
             return
 
         # Stop demo if running
-        if ENABLE_DEMO and hasattr(self, "_demo_timer") and self._demo_timer.isActive():
+        if ENABLE_DEMO and self._demo_active:
             self._stop_demo()
 
         self._clear_transcript()
 
-        cfg = WhisperXConfig(
-            model_size="medium",
-            language="de",
-            device="cpu",
-            compute_type="int8",
-            batch_size=4,
-        )
-
+        self._file_busy = True
         if self.btn_transcribe_file is not None:
             self.btn_transcribe_file.setEnabled(False)
 
         self.bus.status.emit("WhisperX: Transkription gestartet …")
         self.bus.call_started.emit(f"Datei: {path}")
 
-        def worker():
-            try:
-                def on_status(msg: str):
-                    self.bus.status.emit(msg)
-
-                def on_segment(seg: dict):
-                    start = float(seg.get("start", 0.0) or 0.0)
-                    end = float(seg.get("end", 0.0) or 0.0)
-                    text = (seg.get("text") or "").strip()
-                    if text:
-                        self.bus.new_text.emit(f"{start:7.2f}s–{end:7.2f}s: {text}")
-
-                tx = WhisperXTranscriber(cfg, on_status=on_status, on_segment=on_segment)
-                tx.transcribe_file(path)
-
-                self.bus.call_ended.emit(f"Datei: {path}")
-                self.bus.status.emit("WhisperX: fertig.")
-            except Exception as e:
-                self.bus.status.emit(f"WhisperX Fehler: {e!r}")
-                self._show_error_safe(repr(e))
-            finally:
-                self._enable_transcribe_button_safe()
-
-        threading.Thread(target=worker, daemon=True).start()
+        self._worker.job.emit(path)
 
-    # ---------------- Safe GUI updates from worker thread ----------------
-
-    def _enable_transcribe_button_safe(self):
-        QMetaObject.invokeMethod(self, "_enable_transcribe_button", Qt.QueuedConnection)
-
-    @Slot()
-    def _enable_transcribe_button(self):
+    @Slot(str)
+    def _on_transcription_done(self, path: str) -> None:
+        self._file_busy = False
         if self.btn_transcribe_file is not None:
             self.btn_transcribe_file.setEnabled(True)
 
-    def _show_error_safe(self, msg: str):
-        self._last_error = msg
-        QMetaObject.invokeMethod(self, "_show_error_dialog", Qt.QueuedConnection)
-
-    @Slot()
-    def _show_error_dialog(self):
-        QMessageBox.critical(self, "WhisperX Fehler", self._last_error)
+    @Slot(str)
+    def _on_transcription_failed(self, msg: str) -> None:
+        self._file_busy = False
+        if self.btn_transcribe_file is not None:
+            self.btn_transcribe_file.setEnabled(True)
+        QMessageBox.critical(self, "WhisperX Fehler", msg)
 
     # ---------------- Actions ----------------
 
     def _clear_transcript(self) -> None:
-        self._transcript_lines = []
+        self._transcript_lines.clear()
+        self._close_overflow(remove=True)
+        self._pending_lines.clear()
+        self._flush_timer.stop()
         self.transcript_edit.clear()
         self.bus.status.emit("Transkript gelöscht.")
 
@@ -468,18 +628,31 @@ class MainWindow(QMainWindow):
             return
 
         default_name = f"transcript_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        path, _ = QFileDialog.getSaveFileName(
+        path, selected_filter = QFileDialog.getSaveFileName(
             self,
             "Transkript exportieren",
             default_name,
-            "Text (*.txt);;All files (*.*)",
+            _EXPORT_FILTER,
         )
         if not path:
             return
+        if selected_filter == _EXPORT_FILTER_GZ and not path.lower().endswith(".gz"):
+            path += ".gz"
 
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                f.write("\n".join(self._transcript_lines) + "\n")
+            # .gz: on-the-fly komprimieren (Level 1 ist etwa so schnell wie die Platte schreibt),
+            # sonst zeilenweise mit 1-MiB-Puffer, ohne das ganze Transkript als String zu bauen
+            if path.lower().endswith(".gz"):
+                out = gzip.open(path, "wt", encoding="utf-8", compresslevel=1)
+            else:
+                out = open(path, "w", encoding="utf-8", buffering=1 << 20)
+            with out as f:
+                # Ausgelagerte (älteste) Zeilen zuerst, dann der Rest aus dem Speicher
+                if self._overflow_file is not None:
+                    self._overflow_file.flush()
+                    with open(self._overflow_path, "r", encoding="utf-8") as src:
+                        shutil.copyfileobj(src, f, 1 << 20)
+                f.writelines(line + "\n" for line in self._transcript_lines)
             self.bus.status.emit(f"Exportiert: {path}")
         except Exception as e:
             QMessageBox.critical(self, "Export fehlgeschlagen", str(e))
@@ -514,10 +687,35 @@ class MainWindow(QMainWindow):
             QMessageBox.No,
         )
         if reply == QMessageBox.Yes:
+            self._close_overflow()
+            if self._worker_thread is not None:
+                # Laufende Datei-Transkription nach dem aktuellen Segment abbrechen und den
+                # Thread sauber auslaufen lassen (kein terminate(): das kann Locks/Modell
+                # in undefiniertem Zustand hinterlassen)
+                self._worker.cancel()
+                self._worker_thread.quit()
+                if not self._worker_thread.wait(WORKER_STOP_TIMEOUT_MS):
+                    # GUI nicht weiter blockieren: Fenster ausblenden, beenden sobald der Thread fertig ist
+                    logging.getLogger(__name__).warning(
+                        "Datei-Worker nach %s ms noch aktiv; beende nach dessen Abbruch.",
+                        WORKER_STOP_TIMEOUT_MS,
+                    )
+                    self._worker_thread.finished.connect(self._on_worker_stopped)
+                    self.hide()
+                    event.ignore()
+                    if self._worker_thread.isFinished():
+                        # Zwischen wait() und connect() fertig geworden: finished kommt nicht mehr
+                        self._on_worker_stopped()
+                    return
             event.accept()
         else:
             event.ignore()
 
+    @Slot()
+    def _on_worker_stopped(self) -> None:
+        # Verzögertes Beenden aus closeEvent (Thread ist jetzt fertig, QThread darf zerstört werden)
+        QApplication.instance().quit()
+
     # ---------------- Mic test ----------------
 
     def _test_microphone(self):
@@ -598,19 +796,15 @@ class MainWindow(QMainWindow):
 
         from app.live_transcriber import LiveTranscriber
 
-        cfg = WhisperXConfig(
-            model_size="medium",
-            language="de",
-            device="cpu",
-            compute_type="int8",
-            batch_size=4,
-            vad_options={
-                "threshold": 0.12,
-                "min_speech_duration_ms": 200,
-                "min_silence_duration_ms": 200,
-                "speech_pad_ms": 200,
-            },
-        )
+        # Gleiche Modell-Einstellungen wie Preload/Datei (gemeinsamer Cache-Eintrag);
+        # vad_options gehört nicht zum Cache-Key und darf live abweichen
+        cfg = _default_whisper_config()
+        cfg.vad_options = {
+            "threshold": 0.12,
+            "min_speech_duration_ms": 200,
+            "min_silence_duration_ms": 200,
+            "speech_pad_ms": 200,
+        }
 
         self._live_transcriber = LiveTranscriber(
             on_text=lambda text: self.bus.new_text.emit(text) if text else None,
@@ -639,10 +833,8 @@ def main() -> int:
     # CLI-Parameter (nur wenn explizit angegeben) – nur sinnvoll, wenn Datei-Transkription aktiv
     if ENABLE_FILE_TRANSCRIBE and len(sys.argv) > 1:
         test_file = sys.argv[1]
-        if os.path.exists(test_file):
-            QTimer.singleShot(500, lambda: win._transcribe_audio_file_direct(test_file))
-        else:
-            print(f"Warnung: Datei nicht gefunden: {test_file}")
+        # Existenz prüft _transcribe_audio_file_direct selbst (Status "Datei nicht gefunden")
+        QTimer.singleShot(500, lambda: win._transcribe_audio_file_direct(test_file))
 
     return app.exec()
 
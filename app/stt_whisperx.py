@@ -2,6 +2,7 @@
 from __future__ import annotations
 import os
 import sys
+import threading
 
 # Für EXE: Cache auf gebundelte Modelle umleiten
 if getattr(sys, 'frozen', False):
@@ -9,31 +10,179 @@ if getattr(sys, 'frozen', False):
     os.environ['HF_HOME'] = os.path.join(base_path, '.cache', 'huggingface')
     os.environ['TORCH_HOME'] = os.path.join(base_path, '.cache', 'torch')
     os.environ['TRANSFORMERS_CACHE'] = os.path.join(base_path, '.cache', 'huggingface', 'hub')
-    
+
+# CPU-Laufzeit-Knöpfe: müssen vor dem Import von ctranslate2/torch gesetzt sein (OpenMP/oneDNN
+# lesen sie nur beim Laden). setdefault, damit Werte aus der Umgebung Vorrang haben;
+# V2T_CPU_TUNING=0 schaltet das komplett ab (z. B. für Tests/Benchmarks).
+CPU_TUNING = os.environ.get("V2T_CPU_TUNING", "1") != "0"
+if CPU_TUNING:
+    _threads = str(os.cpu_count() or 4)
+    os.environ.setdefault("OMP_NUM_THREADS", _threads)
+    os.environ.setdefault("MKL_NUM_THREADS", _threads)
+    os.environ.setdefault("DNNL_DEFAULT_FPMATH_MODE", "BF16")
+    os.environ.setdefault("THP_MEM_ALLOC_ENABLE", "1")
+    os.environ.setdefault("LRU_CACHE_CAPACITY", "1024")
 
 from dataclasses import dataclass
-from typing import Callable, Optional
+from typing import Any, Callable, Iterator, Optional
 
-# ---- PyTorch Workaround (optional) ----
-# Hinweis: Der pickle.Unpickler Patch ist in Python 3.12 nicht zuverlässig (immutable type).
-# Daher nur torch.load Workaround, falls du ihn wirklich brauchst.
-try:
-    import torch
+import numpy as np
+import soundfile as sf
+from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio
 
-    _original_load = torch.load
+# torch wird hier selbst nicht mehr gebraucht; ist es schon geladen (z. B. durch whisperx),
+# die Thread-Pools passend zu OMP_NUM_THREADS setzen
+if CPU_TUNING and "torch" in sys.modules:
+    try:
+        _torch = sys.modules["torch"]
+        _torch.set_num_threads(int(os.environ["OMP_NUM_THREADS"]))
+        _torch.set_num_interop_threads(1)
+    except Exception:
+        pass
 
-    def _unsafe_load(*args, **kwargs):
-        # Erzwinge weights_only=False für alle Loads
-        kwargs["weights_only"] = False
-        return _original_load(*args, **kwargs)
 
-    torch.load = _unsafe_load
-except Exception as e:
-    print(f"Warning: Could not patch torch.load: {e}")
+# Geladene Modelle prozessweit teilen: (model_size, device, compute_type, language) -> (model, batched)
+_MODEL_CACHE: dict[tuple, Any] = {}
+_MODEL_LOCK = threading.Lock()
+
+# Ab dieser Länge läuft die Transkription über die gebatchte Pipeline (VAD-Chunks parallel)
+_BATCHED_MIN_SECONDS = 30.0
+_BATCHED_MIN_SAMPLES = int(_BATCHED_MIN_SECONDS * 16000)
+
+# WAV-Dateien werden in Blöcken dieser Länge gelesen und transkribiert (Speicher O(Block))
+_FILE_CHUNK_SECONDS = 30.0
+_FILE_CHUNK_SAMPLES = int(_FILE_CHUNK_SECONDS * 16000)
+# Blockgrenze nicht hart bei 30 s, sondern an der leisesten Stelle der letzten 2 s (20-ms-Raster);
+# der Rest wandert an den Anfang des nächsten Blocks, damit kein Wort zerschnitten wird
+_FILE_CUT_SEARCH_SAMPLES = int(2.0 * 16000)
+_FILE_CUT_FRAME_SAMPLES = int(0.02 * 16000)
+
+# Wiederverwendbare float32-Puffer für das Datei-Lesen (geteilt über Transcriber-Instanzen)
+_AUDIO_BUF_POOL: list[np.ndarray] = []
+_AUDIO_BUF_LOCK = threading.Lock()
+_AUDIO_BUF_MAX_SAMPLES = _FILE_CHUNK_SAMPLES * 8
+
+# Stille zwischen gebündelten Live-Fenstern (pack_batch), damit VAD sie sauber trennt
+_BATCH_GAP_SECONDS = 0.5
+_BATCH_GAP_SAMPLES = int(_BATCH_GAP_SECONDS * 16000)
+
+# int16-PCM -> float32 in [-1, 1]
+INT16_SCALE = np.float32(1.0 / 32768.0)
+
+
+def _acquire_audio_buf(n: int) -> np.ndarray:
+    """float32-Puffer mit mindestens n Samples aus dem Pool (oder neu); Aufrufer schneidet zu."""
+    with _AUDIO_BUF_LOCK:
+        for i, buf in enumerate(_AUDIO_BUF_POOL):
+            if buf.size >= n:
+                return _AUDIO_BUF_POOL.pop(i)
+    return np.empty(n, dtype=np.float32)
+
+
+def _release_audio_buf(buf: np.ndarray) -> None:
+    if buf.size <= _AUDIO_BUF_MAX_SAMPLES:
+        with _AUDIO_BUF_LOCK:
+            _AUDIO_BUF_POOL.append(buf)
+
+
+def _downmix_mono(frames: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """(samples, channels) float32 -> Mono direkt in out (ohne mean/astype-Zwischenarrays)."""
+    ch = frames.shape[1]
+    if ch == 2:
+        np.add(frames[:, 0], frames[:, 1], out=out)
+    else:
+        np.sum(frames, axis=1, dtype=np.float32, out=out)
+    out *= np.float32(1.0 / ch)
+    return out
+
+
+def pcm16_to_float32(samples: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Cast + Skalierung in einem Durchlauf direkt in out (keine Zwischenkopie)."""
+    np.multiply(samples, INT16_SCALE, out=out, casting="unsafe")
+    return out
 
-import numpy as np
-import soundfile as sf
-import whisperx
+
+def _quiet_cut(audio: np.ndarray) -> int:
+    """Schnittposition am Ende von audio: Mitte des leisesten 20-ms-Frames in den letzten ~2 s."""
+    frame = _FILE_CUT_FRAME_SAMPLES
+    search = min(_FILE_CUT_SEARCH_SAMPLES, audio.size // 2) // frame * frame
+    if search < frame:
+        return audio.size
+    tail = audio[audio.size - search:].reshape(-1, frame)
+    energy = np.einsum("ij,ij->i", tail, tail)
+    return audio.size - search + int(energy.argmin()) * frame + frame // 2
+
+
+def _iter_soundfile_chunks(path: str, chunk_samples: int = _FILE_CHUNK_SAMPLES) -> Iterator[np.ndarray]:
+    """
+    WAV/FLAC/OGG blockweise als float32-Mono lesen, statt die ganze Datei in den Speicher zu laden.
+    Blöcke enden an einer leisen Stelle (_quiet_cut); der Rest wird in den nächsten Block übernommen.
+    Gelesen wird direkt in Pool-Puffer; jeder Block ist nur bis zum nächsten next() gültig.
+    """
+    f = sf.SoundFile(path)
+    if f.samplerate != 16000:
+        # Nicht 16 kHz (z. B. 44.1-kHz-FLAC): sauber per PyAV resamplen statt selbst zu basteln
+        f.close()
+        yield from _iter_decoded(path)
+        return
+
+    with f:
+        ch = f.channels
+        # Kurze Dateien: Puffer nur so groß wie die Datei (Frame-Anzahl steht im Header)
+        n = min(chunk_samples, f.frames) if f.frames > 0 else chunk_samples
+        work = _acquire_audio_buf(n)
+        raw = _acquire_audio_buf(n * ch) if ch > 1 else None
+        try:
+            carry = 0
+            while True:
+                need = n - carry
+                if raw is None:
+                    got = f.read(out=work[carry:n]).shape[0]
+                else:
+                    frames = f.read(out=raw[:need * ch].reshape(need, ch))
+                    got = frames.shape[0]
+                    # Mono erzwingen: (samples, channels) -> mono
+                    _downmix_mono(frames, work[carry:carry + got])
+                total = carry + got
+
+                if got < need or (f.frames > 0 and f.tell() >= f.frames):
+                    # Dateiende: Rest komplett ausgeben
+                    if total:
+                        yield work[:total]
+                    return
+
+                cut = _quiet_cut(work[:total])
+                yield work[:cut]
+                carry = total - cut
+                work[:carry] = work[cut:total]
+        finally:
+            _release_audio_buf(work)
+            if raw is not None:
+                _release_audio_buf(raw)
+
+
+def _iter_decoded(path: str) -> Iterator[np.ndarray]:
+    """Komprimierte Formate in-process per PyAV dekodieren (16 kHz mono, kein ffmpeg-Prozess)."""
+    yield decode_audio(path, sampling_rate=16000)
+
+
+def _iter_ffmpeg(path: str) -> Iterator[np.ndarray]:
+    """Letzter Ausweg für unbekannte Endungen: whisperx startet ffmpeg als Subprozess."""
+    import whisperx
+
+    yield whisperx.load_audio(path)
+
+
+# Dateiendung -> Loader (liefert float32-Mono-Blöcke, 16 kHz); alles andere über ffmpeg
+_LOADERS: dict[str, Callable[[str], Iterator[np.ndarray]]] = {
+    ".wav": _iter_soundfile_chunks,
+    ".flac": _iter_soundfile_chunks,
+    ".ogg": _iter_soundfile_chunks,
+    ".mp3": _iter_decoded,
+    ".m4a": _iter_decoded,
+    ".aac": _iter_decoded,
+}
+AUDIO_EXTS = tuple(_LOADERS)
 
 
 @dataclass
@@ -44,12 +193,21 @@ class WhisperXConfig:
     compute_type: str = "int8"
     batch_size: int = 4
     vad_options: Optional[dict] = None
+    # Dekodierung: greedy, ohne Temperatur-Fallback und ohne Kontext aus dem vorherigen Fenster
+    # (Experiment, docs §11; Baseline war Beam 5 mit Fallback über ein Temperatur-Tupel)
+    beam_size: int = 1
+    best_of: int = 1
+    temperature: float | tuple[float, ...] = 0.0
+    condition_on_previous_text: bool = False
+    without_timestamps: bool = False
 
 
 class WhisperXTranscriber:
     """
-    Offline-Transkription einer Audiodatei.
-    Für WAV (insb. aus dem Live-Pfad) wird soundfile verwendet (kein ffmpeg).
+    Offline-Transkription einer Audiodatei oder eines float32-Arrays (16 kHz, mono).
+    Backend ist faster-whisper (CTranslate2, z. B. INT8 auf CPU); der Klassenname bleibt
+    aus Kompatibilität. Für WAV wird soundfile verwendet (kein ffmpeg); der Live-Pfad
+    übergibt Arrays direkt.
     """
 
     def __init__(
@@ -57,82 +215,235 @@ class WhisperXTranscriber:
         cfg: WhisperXConfig,
         on_status: Optional[Callable[[str], None]] = None,
         on_segment: Optional[Callable[[dict], None]] = None,
+        on_segments: Optional[Callable[[np.ndarray, np.ndarray, list[str]], None]] = None,
     ):
         self.cfg = cfg
         self.on_status = on_status or (lambda _: None)
         self.on_segment = on_segment or (lambda _: None)
+        # Optional für Dateien: alle Segmente eines Blocks auf einmal als (starts, ends, texts)
+        self.on_segments = on_segments
         self._model = None
+        self._batched = None
+        # Kooperativer Abbruch für Dateien: wird zwischen Blöcken und zwischen Segmenten geprüft
+        self._cancel = threading.Event()
+
+    def cancel(self) -> None:
+        """Laufende Datei-Transkription nach dem aktuellen Segment beenden (bleibt gesetzt)."""
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
 
     def _ensure_model(self) -> None:
-        if self._model is None:
-            self.on_status(
-                f"WhisperX: lade Modell '{self.cfg.model_size}' "
-                f"(device={self.cfg.device}, compute_type={self.cfg.compute_type}) …"
-            )
-            self._model = whisperx.load_model(
-                self.cfg.model_size,
-                device=self.cfg.device,
-                compute_type=self.cfg.compute_type,
-                language=self.cfg.language,
-                vad_method="silero",
-                vad_options=self.cfg.vad_options,
-            )
-            self.on_status("WhisperX: Modell geladen.")
+        if self._model is not None:
+            return
+
+        key = (self.cfg.model_size, self.cfg.device, self.cfg.compute_type, self.cfg.language)
+        # Unter dem Lock laden: ein paralleler Aufrufer (z. B. Preload beim App-Start) wartet
+        # auf dasselbe Modell, statt es ein zweites Mal zu laden
+        with _MODEL_LOCK:
+            cached = _MODEL_CACHE.get(key)
+            if cached is None:
+                self.on_status(
+                    f"WhisperX: lade Modell '{self.cfg.model_size}' "
+                    f"(device={self.cfg.device}, compute_type={self.cfg.compute_type}) …"
+                )
+                model = WhisperModel(
+                    self.cfg.model_size,
+                    device=self.cfg.device,
+                    compute_type=self.cfg.compute_type,
+                    cpu_threads=os.cpu_count() or 0,
+                    num_workers=1,
+                )
+                cached = (model, BatchedInferencePipeline(model))
+                _MODEL_CACHE[key] = cached
+                self.on_status("WhisperX: Modell geladen.")
+        self._model, self._batched = cached
 
     def preload(self) -> None:
         self._ensure_model()
 
-    @staticmethod
-    def _load_wav_soundfile(path: str) -> np.ndarray:
-        # soundfile liefert float32/float64; wir zwingen float32
-        audio, sr = sf.read(path, dtype="float32", always_2d=False)
+    def transcribe_file(self, audio_path: str) -> dict:
+        try:
+            os.stat(audio_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Audio-Datei nicht gefunden: {audio_path}") from None
+
+        try:
+            self._ensure_model()
+        except Exception as e:
+            raise RuntimeError(f"Modell-Laden fehlgeschlagen: {e}") from e
 
-        # Mono erzwingen
-        if isinstance(audio, np.ndarray) and audio.ndim == 2:
-            # (samples, channels) -> mono
-            audio = audio.mean(axis=1).astype(np.float32, copy=False)
+        self.on_status("WhisperX: lade Audio …")
 
-        if sr != 16000:
-            # Dein Live-Pfad schreibt 16kHz WAV. Wenn doch abweichend, lieber hart failen,
-            # statt schlecht zu resamplen "irgendwie".
-            raise RuntimeError(f"Unerwartete Sample-Rate {sr} Hz (erwartet 16000 Hz).")
+        # WAV/FLAC/OGG per soundfile gestreamt (Segmente kommen schon während des Lesens),
+        # mp3/m4a/aac per PyAV; ffmpeg (whisperx) nur für unbekannte Endungen
+        ext = os.path.splitext(audio_path)[1].lower()
+        loader = _LOADERS.get(ext, _iter_ffmpeg)
+        return self._transcribe_chunks(loader(audio_path))
 
-        return audio
+    def _transcribe_chunks(self, chunks: Iterator[np.ndarray]) -> dict:
+        """
+        Blöcke nacheinander transkribieren; Zeitstempel um den laufenden Offset verschieben.
+        on_segments bekommt die Segmente pro Block gebündelt (Text bereits gestrippt).
+        """
+        segments = []
+        language = self.cfg.language
+        offset = 0.0
+        try:
+            while not self._cancel.is_set():
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    raise RuntimeError(f"Audio-Laden fehlgeschlagen: {e}") from e
 
-    def transcribe_file(self, audio_path: str) -> dict:
-        if not os.path.exists(audio_path):
-            raise FileNotFoundError(f"Audio-Datei nicht gefunden: {audio_path}")
+                result = self._transcribe_audio(chunk, offset=offset)
+                segs = result["segments"]
+                segments.extend(segs)
+                if self.on_segments is not None and segs:
+                    n = len(segs)
+                    starts = np.fromiter((s["start"] for s in segs), dtype=np.float64, count=n)
+                    ends = np.fromiter((s["end"] for s in segs), dtype=np.float64, count=n)
+                    self.on_segments(starts, ends, [s["text"].strip() for s in segs])
+                language = result["language"]
+                offset += chunk.size / 16000
+        finally:
+            # Generator sofort schließen (gibt Datei und Pool-Puffer frei, auch bei Fehlern)
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
 
+        return {"segments": segments, "language": language}
+
+    def transcribe_array(self, audio_f32: np.ndarray, initial_prompt: Optional[str] = None) -> dict:
+        """
+        Transkribiert ein float32-Array (16 kHz, mono, Wertebereich [-1, 1]) ohne Umweg über eine Datei.
+        Das Array wird nur während des Aufrufs gelesen und darf danach wiederverwendet werden.
+
+        initial_prompt: bereits transkribierter Text davor (Left-Context), damit Whisper am
+        Fensteranfang nicht neu raten muss.
+        """
         try:
             self._ensure_model()
         except Exception as e:
             raise RuntimeError(f"Modell-Laden fehlgeschlagen: {e}") from e
 
-        self.on_status("WhisperX: lade Audio …")
-        try:
-            # Für WAV direkt per soundfile (ffmpeg-frei).
-            # Wenn du auch mp3/m4a willst, musst du entweder ffmpeg nutzen oder hier fallunterscheiden.
-            if audio_path.lower().endswith(".wav"):
-                audio = self._load_wav_soundfile(audio_path)
+        return self._transcribe_audio(audio_f32, initial_prompt=initial_prompt)
+
+    @staticmethod
+    def batch_length(sizes: list[int]) -> int:
+        """Länge des zusammengesetzten Arrays, das pack_batch für diese Eingaben erzeugt."""
+        return sum(sizes) + _BATCH_GAP_SAMPLES * max(0, len(sizes) - 1)
+
+    @staticmethod
+    def batch_offsets(sizes: list[int]) -> list[int]:
+        """Startposition (Samples) jeder Eingabe im zusammengesetzten Array."""
+        offsets = []
+        pos = 0
+        for size in sizes:
+            offsets.append(pos)
+            pos += size + _BATCH_GAP_SAMPLES
+        return offsets
+
+    @staticmethod
+    def pack_batch(audios: list[np.ndarray], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Arrays (float32 oder int16-PCM) mit kurzer Stille dazwischen zu einem float32-Array
+        zusammensetzen. out: optionaler Puffer (>= batch_length) zum Wiederverwenden; int16 wird
+        beim Zusammensetzen in einem Durchlauf konvertiert.
+        """
+        total = WhisperXTranscriber.batch_length([a.size for a in audios])
+        if out is None or out.size < total:
+            out = np.empty(total, dtype=np.float32)
+        audio = out[:total]
+
+        pos = 0
+        for i, a in enumerate(audios):
+            if i:
+                audio[pos:pos + _BATCH_GAP_SAMPLES] = 0.0
+                pos += _BATCH_GAP_SAMPLES
+            dst = audio[pos:pos + a.size]
+            if a.dtype == np.int16:
+                pcm16_to_float32(a, dst)
             else:
-                audio = whisperx.load_audio(audio_path)
+                dst[:] = a
+            pos += a.size
+        return audio
 
+    def transcribe_packed(
+        self,
+        audio: np.ndarray,
+        n_inputs: int,
+        batch_size: Optional[int] = None,
+        initial_prompt: Optional[str] = None,
+    ) -> dict:
+        """
+        Transkribiert ein mit pack_batch zusammengesetztes Array aus n_inputs Eingaben in einem Aufruf.
+        Die Stille zwischen den Eingaben lässt VAD sie trennen; die gebatchte Pipeline verarbeitet
+        die entstehenden Segmente dann gemeinsam. Segmente kommen in Reihenfolge der Eingabe über on_segment.
+        """
+        try:
+            self._ensure_model()
         except Exception as e:
-            raise RuntimeError(f"Audio-Laden fehlgeschlagen: {e}") from e
+            raise RuntimeError(f"Modell-Laden fehlgeschlagen: {e}") from e
+
+        return self._transcribe_audio(
+            audio,
+            batch_size=batch_size or max(self.cfg.batch_size, n_inputs),
+            initial_prompt=initial_prompt,
+        )
 
+    def _transcribe_audio(
+        self,
+        audio: np.ndarray,
+        batch_size: Optional[int] = None,
+        initial_prompt: Optional[str] = None,
+        offset: float = 0.0,
+    ) -> dict:
+        """
+        Kurze Arrays (Live-Fenster) laufen sequentiell über WhisperModel, lange Dateien und
+        gebündelte Fenster (batch_size gesetzt) über BatchedInferencePipeline.
+        Segmente werden beim Iterieren des Generators sofort an on_segment gegeben;
+        offset (Sekunden) wird auf start/end addiert, wenn audio ein Block einer Datei ist.
+        """
         self.on_status("WhisperX: transkribiere …")
+        kwargs = dict(
+            # language muss hier gesetzt bleiben: faster-whisper kennt keine Sprache aus dem
+            # Modell-Laden und würde sonst pro Aufruf eine Spracherkennung (Encoder+Decoder) fahren
+            language=self.cfg.language,
+            task="transcribe",
+            beam_size=self.cfg.beam_size,
+            best_of=self.cfg.best_of,
+            temperature=self.cfg.temperature,
+            condition_on_previous_text=self.cfg.condition_on_previous_text,
+            without_timestamps=self.cfg.without_timestamps,
+            initial_prompt=initial_prompt,
+            vad_filter=True,
+            vad_parameters=self.cfg.vad_options,
+        )
+        segments = []
         try:
-            result = self._model.transcribe(
-                audio,
-                batch_size=self.cfg.batch_size,
-                language=self.cfg.language,
-            )
+            if batch_size is not None or audio.size >= _BATCHED_MIN_SAMPLES:
+                seg_iter, info = self._batched.transcribe(
+                    audio, batch_size=batch_size or self.cfg.batch_size, **kwargs
+                )
+            else:
+                seg_iter, info = self._model.transcribe(audio, **kwargs)
+
+            # Generator: die eigentliche Dekodierung passiert erst beim Iterieren
+            for s in seg_iter:
+                if self._cancel.is_set():
+                    # Abbruch auch innerhalb eines Blocks (mp3/m4a/ffmpeg kommen als ein Block):
+                    # den Generator nicht weiter iterieren beendet die Dekodierung
+                    break
+                seg = {"start": s.start + offset, "end": s.end + offset, "text": s.text}
+                segments.append(seg)
+                self.on_segment(seg)
         except Exception as e:
             raise RuntimeError(f"Transkription fehlgeschlagen: {e}") from e
 
-        segments = result.get("segments", []) or []
-        for seg in segments:
-            self.on_segment(seg)
-
         self.on_status("WhisperX: Transkription fertig.")
-        return result
+        return {"segments": segments, "language": info.language}